@@ -1,11 +1,150 @@
 import os
 import re
-import json
-import nltk
-from nltk.stem import PorterStemmer
-from collections import defaultdict
+import pickle
+import functools
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import Stemmer
+from pyroaring import BitMap, FrozenBitMap
 import datetime
 
+# precompiled patterns used on every document and query
+_TOKEN_RE = re.compile(r'\b[a-zA-Z]+\b')
+_QUERY_TOKEN_RE = re.compile(r'[()]|[^\s()]+')
+_PROX_RE = re.compile(r'(.*?)\s+/\s*(\d+)$')
+_NUMBER_RE = re.compile(r'\d+')
+
+_EMPTY_POSTINGS = FrozenBitMap()
+
+# a word occurrence is stored as one int64 key: doc_id << 32 | position
+_DOC_SHIFT = 32
+_MAX_DISTANCE = 2**31 - 1  # keeps keys from different docs out of range of each other
+
+INDEX_FILE = 'indexes.pkl'
+INDEX_VERSION = 4  # bump whenever the saved layout changes
+
+_stemmer = Stemmer.Stemmer('porter')
+_stem = functools.lru_cache(maxsize=200000)(_stemmer.stemWord)  # memoized stemmer
+
+# removing stop words and stemming
+# tokenizing the text
+def _preprocess_text(text, stop_words):
+    stem = _stem  # local binding for the hot loop
+    tokens = _TOKEN_RE.findall(text.lower())
+    # the porter stemmer reduces some tokens (e.g. the 's' of "'s") to '', which is not a term
+    return [
+        (stemmed_token, pos) for pos, token in enumerate(tokens)
+        if token not in stop_words and (stemmed_token := stem(token))
+    ]
+
+def _read_document(file_path):
+    # read once, then decode in memory; latin-1 accepts any byte sequence
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+# runs in the reader threads of _build_indexes; errors travel with the result
+def _read_file(task):
+    doc_id, file_path = task
+    try:
+        return doc_id, _read_document(file_path), None
+    except Exception as e:
+        return doc_id, None, str(e)
+
+# runs in the worker processes of _build_indexes
+def _preprocess_document(stop_words, task):
+    doc_id, content, error = task
+    if error is not None:
+        return doc_id, None, error
+    try:
+        return doc_id, _preprocess_text(content, stop_words), None
+    except Exception as e:
+        return doc_id, None, str(e)
+
+# below this many documents (or on one CPU) starting worker processes and reader
+# threads costs more than it saves
+_PARALLEL_MIN_DOCS = 2000
+_CHUNKSIZE = 32
+
+# yields (doc_id, preprocessed_tokens, error) for each task, in any order
+def _preprocess_documents(stop_words, tasks):
+    worker = functools.partial(_preprocess_document, stop_words)
+    cpus = os.cpu_count() or 1
+    if len(tasks) < _PARALLEL_MIN_DOCS or cpus == 1:
+        yield from map(worker, map(_read_file, tasks))
+        return
+    # no more processes than there are chunks to hand out
+    processes = min(cpus, -(-len(tasks) // _CHUNKSIZE))
+    # threads read files ahead while the processes tokenize and stem
+    with ThreadPoolExecutor(max_workers=8) as readers, Pool(processes) as pool:
+        contents = readers.map(_read_file, tasks)
+        yield from pool.imap_unordered(worker, contents, chunksize=_CHUNKSIZE)
+
+# Boolean operators, binding tightest first; NOT is binary (A NOT B = A - B)
+_PRECEDENCE = {'NOT': 3, 'AND': 2, 'OR': 1}
+
+# RPN operand standing for every document; unary NOT B becomes ALL NOT B
+_ALL_DOCS = object()
+
+# shunting-yard: convert query tokens to reverse Polish notation;
+# expect_operand tracks whether a term/bracket or an operator must come next
+def _to_rpn(tokens):
+    output = []
+    operators = []
+    expect_operand = True
+    for token in tokens:
+        if token == '(':
+            if not expect_operand:
+                raise ValueError("missing operator before '('")
+            operators.append(token)
+            expect_operand = True  # so a NOT right after '(' is unary
+        elif token == ')':
+            if expect_operand:
+                raise ValueError("missing operand before ')'")
+            while operators and operators[-1] != '(':
+                output.append(operators.pop())
+            if not operators:
+                raise ValueError("unbalanced ')'")
+            operators.pop()
+        elif token == 'NOT' and expect_operand:
+            # unary prefix NOT: supply the universe as its left operand
+            output.append(_ALL_DOCS)
+            operators.append(token)
+        elif token in _PRECEDENCE:
+            if expect_operand:
+                raise ValueError(f"missing operand for {token}")
+            while (operators and operators[-1] != '('
+                   and _PRECEDENCE[operators[-1]] >= _PRECEDENCE[token]):
+                output.append(operators.pop())
+            operators.append(token)
+            expect_operand = True
+        else:
+            if not expect_operand:
+                raise ValueError("terms must be joined by AND, OR or NOT")
+            output.append(token)
+            expect_operand = False
+    if expect_operand:
+        raise ValueError("query ends without an operand")
+    while operators:
+        operator = operators.pop()
+        if operator == '(':
+            raise ValueError("unbalanced '('")
+        output.append(operator)
+    return output
+
+# doc_ids where a key in keys1 lies within k of a key in keys2 (both sorted)
+def _near_docs(keys1, keys2, k):
+    # the closest key2 to each key1 is at its insertion point or just before it
+    idx = np.searchsorted(keys2, keys1)
+    after = keys2[np.minimum(idx, len(keys2) - 1)]
+    before = keys2[np.maximum(idx - 1, 0)]
+    near = (np.abs(after - keys1) <= k) | (np.abs(keys1 - before) <= k)
+    return np.unique(keys1[near] >> _DOC_SHIFT)
+
 class InformationRetrievalSystem:
     def __init__(self, docs_folder, stop_words_file):
         """
@@ -16,10 +155,14 @@ class InformationRetrievalSystem:
         self.docs_folder = docs_folder
         self.stop_words_file = stop_words_file
         self.stop_words = self._load_stop_words()
-        self.stemmer = PorterStemmer()
-        self.inverted_index = defaultdict(list)  # term -> [doc_ids]
-        self.positional_index = defaultdict(lambda: defaultdict(list))  # term -> {doc_id -> [positions]}
+        self._term_id = {}  # term -> term_id
+        self._id_term = []  # term_id -> term
+        self.inverted_index = []  # term_id -> BitMap of doc_ids
+        self._position_keys = None  # all occurrence keys, grouped by term_id and sorted
+        self._term_offsets = None  # term_id -> start of its keys; term_id + 1 -> end
         self.doc_ids = {} # doc_id -> filename
+        self._all_docs = BitMap()  # every indexed doc_id, the universe for NOT
+        self._cached_query = functools.lru_cache(maxsize=1024)(self._run_query)  # query -> [doc_ids]
         self._build_indexes()
 
     #load Stop words from file
@@ -36,21 +179,11 @@ class InformationRetrievalSystem:
             print(f"Warning: Stop words file {self.stop_words_file} not found.")
             return set()
     
-    # removing stop words and stemming
-    # tokenizing the text
-    def _preprocess_text(self, text):
-        tokens = re.findall(r'\b[a-zA-Z]+\b', text.lower())
-        preprocessed_tokens = []
-        for pos, token in enumerate(tokens):
-            if token not in self.stop_words:
-                stemmed_token = self.stemmer.stem(token)
-                preprocessed_tokens.append((stemmed_token, pos))
-        return preprocessed_tokens
-    
     def _build_indexes(self):
         print("Building indexes...")
+        self._cached_query.cache_clear()
         try:
-            if os.path.exists('indexes.json'):
+            if os.path.exists(INDEX_FILE):
                 self._load_indexes()
                 print("Loaded existing indexes.")
                 return
@@ -58,35 +191,52 @@ class InformationRetrievalSystem:
             print(f"Error loading saved indexes: {e}")
             print("Building indexes from scratch...")
 
+        # start from empty state; an earlier build or a failed load may have filled it
+        self._term_id = {}
+        self._id_term = []
+        self.doc_ids = {}
+        
         processed_docs = 0
         failed_docs = []
         
-        for doc_id, filename in enumerate(os.listdir(self.docs_folder)):
-            if not filename.endswith('.txt'):
+        # sorted so doc ids are stable across platforms and runs
+        with os.scandir(self.docs_folder) as entries:
+            doc_files = sorted(
+                (entry.name, entry.path) for entry in entries
+                if entry.is_file() and entry.name.endswith('.txt')
+            )
+        
+        tasks = [(doc_id, file_path) for doc_id, (_, file_path) in enumerate(doc_files)]
+        positional_index = []  # term_id -> {doc_id -> [positions]}
+        
+        # local bindings for the merge loop
+        term_ids = self._term_id
+        id_term = self._id_term
+        
+        # merge preprocessed documents into the indexes here
+        for doc_id, preprocessed_tokens, error in _preprocess_documents(self.stop_words, tasks):
+            filename = doc_files[doc_id][0]
+            if error is not None:
+                failed_docs.append((filename, error))
                 continue
-                
-            file_path = os.path.join(self.docs_folder, filename)
             
-            try:
-                content = self._read_document(file_path)
-                
-                # Process document
-                self.doc_ids[doc_id] = filename
-                preprocessed_tokens = self._preprocess_text(content)
-                
-                # Update indexes
-                terms_in_doc = set()
-                for term, position in preprocessed_tokens:
-                    terms_in_doc.add(term)
-                    self.positional_index[term][doc_id].append(position)
-                
-                for term in terms_in_doc:
-                    self.inverted_index[term].append(doc_id)
-                    
-                processed_docs += 1
-                
-            except Exception as e:
-                failed_docs.append((filename, str(e)))
+            self.doc_ids[doc_id] = filename
+            
+            # Update positions only; posting lists are derived from them at the end
+            for term, position in preprocessed_tokens:
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(id_term)
+                    id_term.append(term)
+                    positional_index.append({})
+                postings = positional_index[term_id]
+                positions = postings.get(doc_id)
+                if positions is None:
+                    postings[doc_id] = [position]
+                else:
+                    positions.append(position)
+            
+            processed_docs += 1
         
         # Log processing results
         print(f"\nProcessing Summary:")
@@ -96,82 +246,101 @@ class InformationRetrievalSystem:
             for doc, error in failed_docs:
                 print(f"- {doc}: {error}")
         
+        self._finalize_indexes(positional_index)
         self._save_indexes()
     
+    # posting lists are the doc_ids holding each term's positions; positions go into one array
+    def _finalize_indexes(self, positional_index):
+        self.inverted_index = [BitMap(postings.keys()) for postings in positional_index]
+        self._all_docs = BitMap(self.doc_ids)
+        
+        keys = []
+        offsets = [0]
+        for postings in positional_index:
+            for doc_id in sorted(postings):
+                doc_key = doc_id << _DOC_SHIFT
+                keys.extend(doc_key | position for position in postings[doc_id])
+            offsets.append(len(keys))
+        self._position_keys = np.array(keys, dtype=np.int64)
+        self._term_offsets = np.array(offsets, dtype=np.int64)
+    
     def _save_indexes(self):
         index_data = {
             'metadata': {
+                'version': INDEX_VERSION,
                 'total_documents': len(self.doc_ids),
-                'total_terms': len(self.inverted_index),
+                'total_terms': len(self._id_term),
                 'created_at': str(datetime.datetime.now())
             },
             'document_mapping': {
-                str(doc_id): {
+                doc_id: {
                     'filename': filename,
                     'path': os.path.join(self.docs_folder, filename)
                 }
                 for doc_id, filename in self.doc_ids.items()
             },
-            'inverted_index': {
-                term: {
-                    'document_frequency': len(postings),
-                    'postings': postings
-                }
-                for term, postings in self.inverted_index.items()
-            },
-            'positional_index': {
-                term: {
-                    str(doc_id): positions
-                    for doc_id, positions in postings.items()
-                }
-                for term, postings in self.positional_index.items()
-            }
+            'terms': self._id_term,
+            # BitMaps pickle in the compressed roaring format
+            'inverted_index': self.inverted_index,
+            'position_keys': self._position_keys,
+            'term_offsets': self._term_offsets
         }
         
         try:
-            with open('indexes.json', 'w', encoding='utf-8') as f:
-                json.dump(index_data, f, indent=2, ensure_ascii=False)
+            with open(INDEX_FILE, 'wb') as f:
+                pickle.dump(index_data, f, protocol=5)
             print("Indexes saved successfully")
         except Exception as e:
             print(f"Error saving indexes: {e}")
     
     def _load_indexes(self):
-        with open('indexes.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(INDEX_FILE, 'rb') as f:
+            data = pickle.load(f)
+        
+        version = data['metadata'].get('version')
+        if version != INDEX_VERSION:
+            raise ValueError(f"index version {version} does not match {INDEX_VERSION}")
         
         # Load document mapping
         self.doc_ids = {
-            int(doc_id): info['filename']
+            doc_id: info['filename']
             for doc_id, info in data['document_mapping'].items()
         }
         
+        self._all_docs = BitMap(self.doc_ids)
+        
+        # Load term ids
+        self._id_term = data['terms']
+        self._term_id = {term: term_id for term_id, term in enumerate(self._id_term)}
+        
         # Load inverted index
-        self.inverted_index = defaultdict(list)
-        for term, info in data['inverted_index'].items():
-            self.inverted_index[term] = info['postings']
+        self.inverted_index = data['inverted_index']
         
         # Load positional index
-        self.positional_index = defaultdict(lambda: defaultdict(list))
-        for term, postings in data['positional_index'].items():
-            for doc_id, positions in postings.items():
-                self.positional_index[term][int(doc_id)] = positions
+        self._position_keys = data['position_keys']
+        self._term_offsets = data['term_offsets']
     
-    def _read_document(self, file_path):
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1'] # used all possible encodings for reading the file
-
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-        
-        # If all encodings fail, try reading in binary mode and decode with errors ignored
-        with open(file_path, 'rb') as f:
-            return f.read().decode('utf-8', errors='ignore')
+    # stemmed term -> BitMap of doc_ids
+    def _postings(self, stemmed_term):
+        if not stemmed_term:
+            return _EMPTY_POSTINGS
+        term_id = self._term_id.get(stemmed_term)
+        if term_id is None:
+            return _EMPTY_POSTINGS
+        return self.inverted_index[term_id]
     
     # main function to process the query
     def process_query(self, query):
+        # repeated queries are served from the cache; copy so callers can't mutate it.
+        # Invalid queries raise instead of returning, so they are never cached and
+        # the message is shown on every submission.
+        try:
+            return list(self._cached_query(query))
+        except ValueError as e:
+            print(e)
+            return []
+    
+    def _run_query(self, query):
 
         # Check for proximity query
         if '/' in query:
@@ -183,166 +352,69 @@ class InformationRetrievalSystem:
         
         # Simple term query
         term = query.strip().lower()
-        stemmed_term = self.stemmer.stem(term)
+        stemmed_term = _stem(term)
         
         # Return document IDs containing the term
-        return sorted(self.inverted_index.get(stemmed_term, []))
+        return list(self._postings(stemmed_term))
     
-    # for processing the boolean query
+    # for processing the boolean query, with optional brackets
+    # Example: "computer AND science NOT (Times AND Series)"
     def _process_boolean_query(self, query):
-        # Handle queries with brackets
-        if '(' in query:
-            return self._process_bracketed_query(query)
-            
-        tokens = re.split(r'\s+(AND|OR|NOT)\s+', query)        
-        if len(tokens) == 1:
-            # Single term query
-            term = tokens[0].lower()
-            stemmed_term = self.stemmer.stem(term)
-            return sorted(self.inverted_index.get(stemmed_term, []))
-        
-        # Initialize result with the first term
-        term = tokens[0].lower()
-        stemmed_term = self.stemmer.stem(term)
-        result = set(self.inverted_index.get(stemmed_term, []))
-        
-        i = 1
-        while i < len(tokens):
-            operator = tokens[i]
-            term = tokens[i + 1].lower() if i + 1 < len(tokens) else ""
-            
-            if not term:
-                break
-                
-            stemmed_term = self.stemmer.stem(term)
-            term_docs = set(self.inverted_index.get(stemmed_term, []))
-            
-            if operator == 'AND':
-                result = result.intersection(term_docs)
-            elif operator == 'OR':
-                result = result.union(term_docs)
-            elif operator == 'NOT':
-                result = result.difference(term_docs)
-            
-            i += 2
-        
-        return sorted(list(result))
-
-    def _process_bracketed_query(self, query):
-        """
-        Process boolean queries containing brackets for nested expressions.
-        Example: "computer AND science NOT (Times AND Series)"
-        """
-        if '(' not in query:
-            return self._process_boolean_query(query)
-        
-        stack = []
-        start = -1
-        
-        for i, char in enumerate(query):
-            if char == '(':
-                stack.append(i)
-            elif char == ')' and stack:
-                start = stack.pop()
-                end = i
-                break
-        
-        if start != -1:
-            inner_expr = query[start + 1:end].strip()
-            inner_result = self._process_boolean_query(inner_expr)
-            
-            placeholder = f"RESULT_{hash(str(inner_result))}"
-            
-            new_query = query[:start] + placeholder + query[end + 1:]
-            
-            final_result = self._process_bracketed_query(new_query)
-            
-            # If the placeholder is directly in the result, we need to replace it
-            if isinstance(final_result, list) and len(final_result) == 1 and str(final_result[0]).startswith("RESULT_"):
-                return inner_result
-            
-            # Process the query again with operators
-            tokens = re.split(r'\s+(AND|OR|NOT)\s+', new_query)
-            
-            # Initialize result based on the first token
-            if tokens[0] == placeholder:
-                result = set(inner_result)
-            else:
-                term = tokens[0].lower()
-                stemmed_term = self.stemmer.stem(term)
-                result = set(self.inverted_index.get(stemmed_term, []))
+        try:
+            rpn = _to_rpn(_QUERY_TOKEN_RE.findall(query))
             
-            i = 1
-            while i < len(tokens):
-                operator = tokens[i]
-                term = tokens[i + 1] if i + 1 < len(tokens) else ""
-                
-                if not term:
-                    break
-                
-                # Check if the term is our placeholder
-                if term == placeholder:
-                    term_docs = set(inner_result)
+            stack = []
+            for token in rpn:
+                if token is _ALL_DOCS:
+                    stack.append(self._all_docs)
+                    continue
+                if token not in _PRECEDENCE:
+                    stack.append(self._postings(_stem(token.lower())))
+                    continue
+                if len(stack) < 2:
+                    raise ValueError(f"missing operand for {token}")
+                term_docs = stack.pop()
+                result = stack.pop()
+                if token == 'AND':
+                    stack.append(result & term_docs)
+                elif token == 'OR':
+                    stack.append(result | term_docs)
                 else:
-                    stemmed_term = self.stemmer.stem(term.lower())
-                    term_docs = set(self.inverted_index.get(stemmed_term, []))
-                
-                if operator == 'AND':
-                    result = result.intersection(term_docs)
-                elif operator == 'OR':
-                    result = result.union(term_docs)
-                elif operator == 'NOT':
-                    result = result.difference(term_docs)
-                
-                i += 2
+                    stack.append(result - term_docs)
             
-            return sorted(list(result))
+            if len(stack) != 1:
+                raise ValueError("terms must be joined by AND, OR or NOT")
+        except ValueError as e:
+            raise ValueError(f"Invalid Boolean query: {e}") from None
         
-        return self._process_boolean_query(query)
+        return list(stack[0])
     
     # for processing the proximity query
     def _process_proximity_query(self, query):
         # Parse the proximity query
-        match = re.match(r'(.*?)\s+(/\s*(\d+))$', query)
+        match = _PROX_RE.match(query)
         if not match:
-            print("Invalid proximity query format. Use 'term1 term2 /k'")
-            return []
+            raise ValueError("Invalid proximity query format. Use 'term1 term2 /k'")
         
         terms_part = match.group(1)
-        k = int(match.group(3))
+        k = min(int(match.group(2)), _MAX_DISTANCE)
         
         # Extract terms
         terms = terms_part.lower().split()
         if len(terms) != 2:
-            print("Proximity query supports only 2 terms. Use 'term1 term2 /k'")
-            return []
-        
-        # Stem the terms
-        stemmed_terms = [self.stemmer.stem(term) for term in terms]
+            raise ValueError("Proximity query supports only 2 terms. Use 'term1 term2 /k'")
         
-        # Find documents containing both terms
-        docs_term1 = set(self.inverted_index.get(stemmed_terms[0], []))
-        docs_term2 = set(self.inverted_index.get(stemmed_terms[1], []))
-        common_docs = docs_term1.intersection(docs_term2)
+        # Stem the terms and look up their ids
+        term_ids = [self._term_id.get(_stem(term)) for term in terms]
+        if None in term_ids:
+            return []
         
-        result_docs = []
+        # Slice each term's sorted occurrence keys and match them in one vectorized pass
+        offsets = self._term_offsets
+        keys1 = self._position_keys[offsets[term_ids[0]]:offsets[term_ids[0] + 1]]
+        keys2 = self._position_keys[offsets[term_ids[1]]:offsets[term_ids[1] + 1]]
         
-        # Check proximity in each document
-        for doc_id in common_docs:
-            positions1 = self.positional_index[stemmed_terms[0]][doc_id]
-            positions2 = self.positional_index[stemmed_terms[1]][doc_id]
-            
-            # Check if any positions are within k words of each other
-            for pos1 in positions1:
-                for pos2 in positions2:
-                    if abs(pos1 - pos2) <= k:
-                        result_docs.append(doc_id)
-                        break
-                else:
-                    continue
-                break
-        
-        return sorted(result_docs)
+        return _near_docs(keys1, keys2, k).tolist()
     
     def print_results(self, doc_ids):
         if not doc_ids:
@@ -353,7 +425,7 @@ class InformationRetrievalSystem:
         for doc_id in doc_ids:
             filename = self.doc_ids[doc_id]
             try:
-                number = int(re.search(r'\d+', filename).group())
+                number = int(_NUMBER_RE.search(filename).group())
                 file_numbers.append(number)
             except (AttributeError, ValueError):
                 file_numbers.append(doc_id)
@@ -392,11 +464,4 @@ def main():
         print()
 
 if __name__ == "__main__":
-    # Check if NLTK stopwords are available, download if needed
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        print("Downloading NLTK resources...")
-        nltk.download('punkt')
-    
     main()
\ No newline at end of file
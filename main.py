@@ -2,9 +2,14 @@ import streamlit as st
 from boolean_retrieval_model import InformationRetrievalSystem
 import os
 
+# kept across Streamlit reruns so the indexes and query cache are reused
+@st.cache_resource(show_spinner=False)
+def load_ir_system():
+    return InformationRetrievalSystem("Abstracts", "stop_words.txt")
+
 class IRSystemWebUI:
     def __init__(self):
-        self.ir_system = InformationRetrievalSystem("Abstracts", "stop_words.txt")
+        self.ir_system = load_ir_system()
         self.setup_ui()
 
     def setup_ui(self):
@@ -1,4 +1,3 @@
-import nltk
 from boolean_retrieval_model import InformationRetrievalSystem
 
 def run_test_queries():
@@ -18,7 +17,38 @@ def run_test_queries():
         "pattern AND clustering",
         "pattern AND clustering AND heart",
         "neural information /2",
-        "feature track /5"
+        "feature track /5",
+        # brackets and precedence: NOT binds tighter than AND, AND tighter than OR
+        "deep AND (learning OR network)",
+        "deep OR learning AND network",
+        "learning OR network NOT time",
+        "deep AND (learning OR network) NOT time",
+        "((deep OR data) AND (time OR series)) NOT neural",
+        # unary NOT: every document without the term
+        "NOT deep",
+        "deep AND NOT learning",
+        "NOT (deep OR learning)",
+        "deep AND (NOT learning)",
+        # malformed: print a message and return no documents
+        "deep AND (learning",
+        "deep AND learning)",
+        "deep AND AND learning",
+        "deep learning AND network",
+        "deep AND (OR time)",
+        "deep (learning OR time)",
+        "deep AND ()",
+        "deep (NOT learning)",
+        "deep AND learning (OR time)"
+    ]
+    
+    # each query must return the same documents as its explicitly bracketed form
+    equivalent_queries = [
+        ("deep OR learning AND network", "deep OR (learning AND network)"),
+        ("learning OR network NOT time", "learning OR (network NOT time)"),
+        ("deep AND (learning OR network) NOT time", "deep AND ((learning OR network) NOT time)"),
+        ("deep AND NOT learning", "deep NOT learning"),
+        ("deep NOT NOT learning", "deep AND learning"),
+        ("deep AND (NOT learning)", "deep NOT learning")
     ]
     
     print("\nRunning test queries...\n")
@@ -27,11 +57,11 @@ def run_test_queries():
         doc_ids = ir_system.process_query(query)
         ir_system.print_results(doc_ids)
         print()
+    
+    print("Checking operator precedence...\n")
+    for query, bracketed in equivalent_queries:
+        status = "OK" if ir_system.process_query(query) == ir_system.process_query(bracketed) else "MISMATCH"
+        print(f"{status}: {query}  ==  {bracketed}")
 
 if __name__ == "__main__":
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        print("Downloading NLTK resources...")
-        nltk.download('punkt')
     run_test_queries()
\ No newline at end of file